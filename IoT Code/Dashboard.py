@@ -1,135 +1,63 @@
 from flask import Flask, request, jsonify, render_template_string
 from flask_cors import CORS
 from datetime import datetime, timedelta
+import atexit
+import heapq
+import json
+import math
+import os
+import threading
+import time
 import requests
 
+from fire_risk import classify_fire_risk
+from frames import FRAME_CONTENT_TYPE, FrameError, decode_frames
+from history import SensorHistory
+from regions import load_regions
+from registry import SensorRegistry
+from snapshot import SnapshotWriter, load_snapshot
+from udp_ingest import UdpIngestListener
+from upstream import INTEREST_SECONDS, UpstreamBudget, refresh_priority
+
 app = Flask(__name__)
 CORS(app)
 
 # ------------------------------
 # SENSOR MODEL
 # ------------------------------
-sensors = {
-    "oakville-1": {
-        "id": "oakville-1",
-        "name": "Oakville Sensor 1",
-        "city": "Oakville",
-        "lat": 43.4675,
-        "lng": -79.6877,
-        "temperature": None,   # from physical sensor
-        "humidity": None,
-        "wind_speed": None,
-        "uv_index": None,
-        "pm2_5": None,
-        "pm10": None,
-        "aqi_us": None,
-        "fire_risk": None,
-        "last_update": None,
-    },
-    "oakville-2": {
-        "id": "oakville-2",
-        "name": "Oakville Sensor 2",
-        "city": "Oakville",
-        "lat": 43.4675,
-        "lng": -79.6877,
-        "temperature": None,   # from physical sensor
-        "humidity": None,
-        "wind_speed": None,
-        "uv_index": None,
-        "pm2_5": None,
-        "pm10": None,
-        "aqi_us": None,
-        "fire_risk": None,
-        "last_update": None,
-    },
-
-    # Virtual sensors (driven by live APIs)
-    "toronto-1": {
-        "id": "toronto-1",
-        "name": "Toronto Central",
-        "city": "Toronto",
-        "lat": 43.6532,
-        "lng": -79.3832,
-        "temperature": None,
-        "humidity": None,
-        "wind_speed": None,
-        "uv_index": None,
-        "pm2_5": None,
-        "pm10": None,
-        "aqi_us": None,
-        "fire_risk": None,
-        "last_update": None,
-    },
-    "mississauga-1": {
-        "id": "mississauga-1",
-        "name": "Mississauga West",
-        "city": "Mississauga",
-        "lat": 43.5890,
-        "lng": -79.6441,
-        "temperature": None,
-        "humidity": None,
-        "wind_speed": None,
-        "uv_index": None,
-        "pm2_5": None,
-        "pm10": None,
-        "aqi_us": None,
-        "fire_risk": None,
-        "last_update": None,
-    },
-    "brampton-1": {
-        "id": "brampton-1",
-        "name": "Brampton North",
-        "city": "Brampton",
-        "lat": 43.7315,
-        "lng": -79.7624,
-        "temperature": None,
-        "humidity": None,
-        "wind_speed": None,
-        "uv_index": None,
-        "pm2_5": None,
-        "pm10": None,
-        "aqi_us": None,
-        "fire_risk": None,
-        "last_update": None,
-    },
-    "vaughan-1": {
-        "id": "vaughan-1",
-        "name": "Vaughan Hills",
-        "city": "Vaughan",
-        "lat": 43.8372,
-        "lng": -79.5083,
-        "temperature": None,
-        "humidity": None,
-        "wind_speed": None,
-        "uv_index": None,
-        "pm2_5": None,
-        "pm10": None,
-        "aqi_us": None,
-        "fire_risk": None,
-        "last_update": None,
-    },
-    "markham-1": {
-        "id": "markham-1",
-        "name": "Markham East",
-        "city": "Markham",
-        "lat": 43.8561,
-        "lng": -79.3370,
-        "temperature": None,
-        "humidity": None,
-        "wind_speed": None,
-        "uv_index": None,
-        "pm2_5": None,
-        "pm10": None,
-        "aqi_us": None,
-        "fire_risk": None,
-        "last_update": None,
-    },
-    "pickering-1": {
-        "id": "pickering-1",
-        "name": "Pickering Lakeside",
-        "city": "Pickering",
-        "lat": 43.8373,
-        "lng": -79.0892,
+# Station metadata comes from the registry file (stations.csv by default);
+# oakville-* are physical sensors, the rest are driven by live APIs.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REGISTRY_PATH = os.environ.get("SENSOR_REGISTRY", os.path.join(BASE_DIR, "stations.csv"))
+REGIONS_PATH = os.environ.get("SENSOR_REGIONS", os.path.join(BASE_DIR, "regions.json"))
+
+registry = SensorRegistry(REGISTRY_PATH)
+
+# region partitions (see regions.py); the first one is the default for
+# stations without a region and for the unscoped /api/temperature routes
+regions = load_regions(REGIONS_PATH)
+DEFAULT_REGION = next(iter(regions))
+
+# e.g. SERVE_REGIONS=gta,ottawa to pin this worker to some partitions
+SERVE_REGIONS = set(
+    r for r in os.environ.get("SERVE_REGIONS", "").split(",") if r
+) or set(regions)
+
+# every sensor across regions, by id; region.sensors holds the same dicts
+sensors = {}
+
+# rolling 24 h temperature buckets per sensor, for sparklines (history.py)
+history = SensorHistory()
+
+
+def new_sensor(sid, name=None, city=None, lat=None, lng=None, region=None):
+    return {
+        "id": sid,
+        "name": name or sid,
+        "city": city or "Unknown",
+        "region": region if region in regions else DEFAULT_REGION,
+        "lat": lat,
+        "lng": lng,
         "temperature": None,
         "humidity": None,
         "wind_speed": None,
@@ -139,11 +67,67 @@ sensors = {
         "aqi_us": None,
         "fire_risk": None,
         "last_update": None,
-    },
-}
+    }
+
+
+def add_sensor(s):
+    sensors[s["id"]] = s
+    region = regions[s["region"]]
+    region.sensors[s["id"]] = s
+    region.invalidate()
+    return s
+
+
+def remove_sensor(sid):
+    s = sensors.pop(sid, None)
+    if s is not None:
+        region = regions[s["region"]]
+        region.sensors.pop(sid, None)
+        region.refreshed_at.pop(sid, None)
+        region.invalidate()
+
+
+def sensor_from_station(st):
+    return new_sensor(st["id"], st["name"], st["city"], st["lat"], st["lng"], st["region"])
+
+
+def station_region(st):
+    return st["region"] if st["region"] in regions else DEFAULT_REGION
+
+
+# this process only holds the shards it serves; other workers own the rest
+for st in registry.load().values():
+    if station_region(st) in SERVE_REGIONS:
+        add_sensor(sensor_from_station(st))
+
+
+def apply_registry_diff(added, removed, changed):
+    """Hot reload: patch only the stations that changed in the registry."""
+    for st in added + changed:
+        s = sensors.get(st["id"])
+        region = station_region(st)
+        if region not in SERVE_REGIONS:
+            if s is not None:
+                # moved to a region another worker serves
+                remove_sensor(s["id"])
+                history.discard(s["id"])
+            continue
+        if s is None:
+            add_sensor(sensor_from_station(st))
+            continue
+        if region != s["region"]:
+            remove_sensor(s["id"])
+            s["region"] = region
+            s.update(name=st["name"], city=st["city"], lat=st["lat"], lng=st["lng"])
+            add_sensor(s)
+        else:
+            s.update(name=st["name"], city=st["city"], lat=st["lat"], lng=st["lng"])
+            regions[region].invalidate()
+    for sid in removed:
+        remove_sensor(sid)
+        history.discard(sid)
+    print(f"[Registry] +{len(added)} -{len(removed)} ~{len(changed)} stations")
 
-# simple cache for external API refresh
-last_refresh = None
 
 # ------------------------------
 # LIVE DATA HELPERS (Open-Meteo)
@@ -207,81 +191,245 @@ def fetch_live_air(lat, lng):
         }
 
 
-def classify_fire_risk(temp, humidity, wind_speed, aqi):
-    """Simple custom fire-risk logic for the dashboard."""
-    if temp is None or humidity is None or wind_speed is None:
-        return "Unknown"
-
-    risk_score = 0
-
-    if temp >= 35:
-        risk_score += 3
-    elif temp >= 30:
-        risk_score += 2
-    elif temp >= 25:
-        risk_score += 1
-
-    if humidity <= 25:
-        risk_score += 3
-    elif humidity <= 40:
-        risk_score += 2
-    elif humidity <= 60:
-        risk_score += 1
-
-    if wind_speed >= 30:
-        risk_score += 3
-    elif wind_speed >= 20:
-        risk_score += 2
-    elif wind_speed >= 10:
-        risk_score += 1
-
-    if aqi is not None:
-        if aqi >= 150:
-            risk_score += 2
-        elif aqi >= 100:
-            risk_score += 1
-
-    if risk_score >= 8:
-        return "Extreme"
-    elif risk_score >= 6:
-        return "High"
-    elif risk_score >= 3:
-        return "Moderate"
-    else:
-        return "Low"
-
-
-def refresh_live_data():
-    """Update all city sensors with live weather + air quality."""
-    for sid, s in sensors.items():
-        lat = s.get("lat")
-        lng = s.get("lng")
-        if lat is None or lng is None:
-            continue
-
-        weather = fetch_live_weather(lat, lng)
-        air = fetch_live_air(lat, lng)
-
+# ------------------------------
+# UPSTREAM REFRESH (budgeted, see upstream.py)
+# ------------------------------
+# Each region has a pacer thread that refreshes its due sensors one at a
+# time, most urgent first, as long as both the region's and the upstream
+# hosts' token buckets allow. The defaults stay well inside Open-Meteo's
+# free tier; sensors that don't fit are served stale and listed by
+# /api/<region>/upstream.
+#
+# UPSTREAM_RATE_PER_MINUTE / UPSTREAM_BURST are the total for the service.
+# The buckets live in each process, so when SERVE_REGIONS splits regions
+# over N workers, set UPSTREAM_WORKERS=N and each takes a 1/N share.
+UPSTREAM_WORKERS = max(1, int(os.environ.get("UPSTREAM_WORKERS", 1)))
+upstream_budget = UpstreamBudget(
+    rate_per_minute=float(os.environ.get("UPSTREAM_RATE_PER_MINUTE", 6)) / UPSTREAM_WORKERS,
+    burst=max(1, int(os.environ.get("UPSTREAM_BURST", 10)) // UPSTREAM_WORKERS),
+)
+UPSTREAM_URLS = (WEATHER_URL, AIR_QUALITY_URL)
+PACER_TICK = 1.0  # seconds between refresh passes
+
+
+def _failed(result):
+    # fetch_live_* return all-None values when the request failed
+    return all(v is None for v in result.values())
+
+
+def refresh_sensor(region, sid, s):
+    """Update one sensor with live weather + air quality.
+
+    A failed upstream call keeps the last-known values and drains that
+    host's bucket to back off; the sensor stays due and is retried later.
+    """
+    weather = fetch_live_weather(s["lat"], s["lng"])
+    air = fetch_live_air(s["lat"], s["lng"])
+    weather_ok = not _failed(weather)
+    air_ok = not _failed(air)
+    if not weather_ok:
+        upstream_budget.penalize(WEATHER_URL)
+    if not air_ok:
+        upstream_budget.penalize(AIR_QUALITY_URL)
+    if not weather_ok and not air_ok:
+        return False
+
+    if weather_ok:
         # Virtual sensors: temperature from API
         if not sid.startswith("oakville"):
             if weather["temperature"] is not None:
                 s["temperature"] = round(weather["temperature"], 1)
+                history.record(sid, s["temperature"])
         # Oakville: keep sensor temp, fill only if missing
         else:
             if s["temperature"] is None and weather["temperature"] is not None:
                 s["temperature"] = round(weather["temperature"], 1)
+                history.record(sid, s["temperature"])
 
         s["humidity"] = weather["humidity"]
         s["wind_speed"] = weather["wind_speed"]
-        s["uv_index"] = air["uv_index"] if air["uv_index"] is not None else weather["uv_index"]
+
+    if air_ok:
         s["pm2_5"] = air["pm2_5"]
         s["pm10"] = air["pm10"]
         s["aqi_us"] = air["aqi_us"]
 
-        s["fire_risk"] = classify_fire_risk(
-            s["temperature"], s["humidity"], s["wind_speed"], s["aqi_us"]
+    if air["uv_index"] is not None:
+        s["uv_index"] = air["uv_index"]
+    elif weather["uv_index"] is not None:
+        s["uv_index"] = weather["uv_index"]
+
+    s["fire_risk"] = classify_fire_risk(
+        s["temperature"], s["humidity"], s["wind_speed"], s["aqi_us"]
+    )
+    s["last_update"] = datetime.utcnow().isoformat()
+    if weather_ok and air_ok:
+        region.refreshed_at[sid] = time.time()
+    return True
+
+
+def upstream_age(region, sid, now):
+    at = region.refreshed_at.get(sid)
+    return None if at is None else now - at
+
+
+def due_sensors(region, now, limit=None):
+    """Located sensors due for a refresh, most urgent first (at most limit)."""
+    due = []
+    # copy: registry hot reload may add/remove stations meanwhile
+    for sid, s in list(region.sensors.items()):
+        if s.get("lat") is None or s.get("lng") is None:
+            continue
+        priority = refresh_priority(
+            upstream_age(region, sid, now),
+            region.refresh_interval,
+            s.get("fire_risk"),
+            region.is_viewed(sid, now, INTEREST_SECONDS),
+        )
+        if priority >= 1:
+            due.append((priority, sid, s))
+    if limit is not None:
+        return heapq.nlargest(limit, due, key=lambda d: d[0])
+    due.sort(key=lambda d: d[0], reverse=True)
+    return due
+
+
+def refresh_due_sensors(region):
+    """Refresh due sensors while the region and host budgets allow."""
+    cost = len(UPSTREAM_URLS)
+    # most ticks have no token to spend; don't score the whole fleet then,
+    # and otherwise only rank as many sensors as the tokens can cover
+    affordable = int(min(region.budget.available() // cost,
+                         upstream_budget.available(UPSTREAM_URLS)))
+    if affordable < 1:
+        return 0
+    refreshed = 0
+    for _, sid, s in due_sensors(region, time.time(), affordable):
+        if not region.budget.try_take(cost):
+            break
+        if not upstream_budget.try_acquire(UPSTREAM_URLS):
+            region.budget.give_back(cost)
+            break
+        if refresh_sensor(region, sid, s):
+            refreshed += 1
+            region.invalidate()
+    return refreshed
+
+
+def pace_region(region):
+    while True:
+        try:
+            refresh_due_sensors(region)
+        except Exception as e:
+            print(f"[Upstream] {region.id} refresh failed: {e}")
+        time.sleep(PACER_TICK)
+
+
+def ensure_pacer(region):
+    """Start a region's refresh loop the first time it is viewed.
+
+    That first view also runs one pass inline (bounded by the bucket
+    bursts), so it doesn't come up empty.
+    """
+    if region.pacer is not None:
+        return
+    with region.pacer_lock:
+        if region.pacer is not None:
+            return
+        refresh_due_sensors(region)
+        region.pacer = threading.Thread(
+            target=pace_region, args=(region,), name=f"pacer-{region.id}", daemon=True
         )
-        s["last_update"] = datetime.utcnow().isoformat()
+        region.pacer.start()
+
+
+def stale_sensors(region, now):
+    """Located sensors whose upstream data is older than the refresh interval."""
+    stale = []
+    for sid, s in list(region.sensors.items()):
+        if s.get("lat") is None or s.get("lng") is None:
+            continue
+        age = upstream_age(region, sid, now)
+        if age is None or age > region.refresh_interval:
+            stale.append({"id": sid, "age": None if age is None else round(age)})
+    return stale
+
+
+# ------------------------------
+# SNAPSHOTS (warm restart, see snapshot.py)
+# ------------------------------
+# a worker pinned to some regions keeps its own file, so workers don't
+# overwrite each other's shards
+SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", os.path.join(
+    BASE_DIR,
+    "dashboard.snapshot.gz" if SERVE_REGIONS == set(regions)
+    else f"dashboard.{'-'.join(sorted(SERVE_REGIONS))}.snapshot.gz",
+))
+SNAPSHOT_INTERVAL = 30  # seconds
+
+# per-sensor values that come from devices / upstream rather than the registry
+LIVE_FIELDS = (
+    "temperature", "humidity", "wind_speed", "uv_index", "pm2_5", "pm10",
+    "aqi_us", "fire_risk", "last_update",
+)
+
+
+def collect_state():
+    return {
+        "saved_at": time.time(),
+        "sensors": [
+            dict(s, registered=s["id"] in registry.stations)
+            for s in list(sensors.values())
+        ],
+        # wall-clock refresh times, so upstream data keeps its age across
+        # restarts and expires on the same schedule
+        "refreshed_at": [
+            [sid, at]
+            for region in regions.values()
+            for sid, at in list(region.refreshed_at.items())
+        ],
+        "history": history.dump(),
+    }
+
+
+def restore_state(state):
+    """Warm start: last-known readings, upstream freshness and history."""
+    for saved in state.get("sensors", []):
+        if not isinstance(saved.get("id"), str):
+            continue  # pre-validation snapshots could hold a None id
+        s = sensors.get(saved["id"])
+        if s is None:
+            if saved.get("registered") or saved["id"] in registry.stations:
+                # removed from the registry since the snapshot, or
+                # registered in a region this worker doesn't serve
+                continue
+            # a device that posted without being in the registry
+            s = new_sensor(
+                saved["id"], saved.get("name"), saved.get("city"),
+                saved.get("lat"), saved.get("lng"), saved.get("region"),
+            )
+            if s["region"] not in SERVE_REGIONS:
+                continue
+            add_sensor(s)
+        for key in LIVE_FIELDS:
+            s[key] = saved.get(key)
+
+    for sid, at in state.get("refreshed_at", []):
+        s = sensors.get(sid)
+        if s is not None:
+            regions[s["region"]].refreshed_at[sid] = at
+
+    # only for sensors that survived the registry / region checks above
+    history.load(state.get("history", {}), keep=set(sensors))
+    for region in regions.values():
+        region.invalidate()
+
+
+warm_state = load_snapshot(SNAPSHOT_PATH)
+if warm_state:
+    restore_state(warm_state)
+    print(f"[Snapshot] restored {len(warm_state.get('sensors', []))} sensors "
+          f"from {SNAPSHOT_PATH}")
 
 
 # ------------------------------
@@ -445,6 +593,10 @@ DASHBOARD_HTML = """
             margin-top: 4px;
             line-height: 1.4;
         }
+        .sensor-spark {
+            margin-top: 6px;
+            display: block;
+        }
         .sensor-risk {
             font-size: 12px;
             margin-top: 4px;
@@ -508,7 +660,7 @@ DASHBOARD_HTML = """
         // ---------------------------
         // INIT LEAFLET MAP
         // ---------------------------
-        let map = L.map("map").setView([43.6532, -79.3832], 9);
+        let map = L.map("map").setView([{{ center[0] }}, {{ center[1] }}], {{ zoom }});
         let markers = {};
 
         // Base map
@@ -629,10 +781,36 @@ DASHBOARD_HTML = """
             return "Hazardous";
         }
 
+        // 24 h min/max band + mean line from /api/<region>/history
+        function sparkline(h) {
+            if (!h) return "";
+            const w = 200, ht = 30;
+            const vals = h.min.concat(h.max).filter(v => v != null);
+            if (vals.length === 0) return "";
+            const lo = Math.min(...vals), hi = Math.max(...vals);
+            const span = hi - lo || 1;
+            const n = h.mean.length;
+            const x = i => (n > 1 ? i / (n - 1) * w : w / 2).toFixed(1);
+            const y = v => (ht - (v - lo) / span * ht).toFixed(1);
+            let band = "", line = "";
+            h.mean.forEach((v, i) => {
+                if (v == null) return;
+                band += `<line x1="${x(i)}" x2="${x(i)}" y1="${y(h.min[i])}" y2="${y(h.max[i])}" stroke="#2a5" stroke-width="2"/>`;
+                line += `${x(i)},${y(v)} `;
+            });
+            return `<svg class="sensor-spark" width="${w}" height="${ht}">${band}` +
+                   `<polyline points="${line}" fill="none" stroke="#00ff88" stroke-width="1"/></svg>`;
+        }
+
         function updateUI() {
-            fetch("/api/temperature")
-            .then(r => r.json())
-            .then(data => {
+            Promise.all([
+                fetch("/api/{{ region_id }}/temperature").then(r => r.json()),
+                // sparklines are optional: a failed history call leaves them out
+                fetch("/api/{{ region_id }}/history?points=48")
+                    .then(r => r.ok ? r.json() : { series: {} })
+                    .catch(() => ({ series: {} }))
+            ])
+            .then(([data, hist]) => {
                 let sensorList = document.getElementById("sensor-list");
                 let alertList = document.getElementById("alerts");
 
@@ -673,6 +851,7 @@ DASHBOARD_HTML = """
                                 "No Data"
                             }</span>
                         </div>
+                        ${sparkline(hist.series[s.id])}
                         <div class="sensor-extra">
                             Humidity: ${humTxt} · Wind: ${windTxt}<br>
                             AQI (US): ${aqiTxt} (${aqiLabel(s.aqi_us)}) · UV: ${uvTxt}<br>
@@ -744,63 +923,244 @@ DASHBOARD_HTML = """
 # FLASK ROUTES
 # ------------------------------
 @app.route("/")
-def dashboard():
-    return render_template_string(DASHBOARD_HTML)
+@app.route("/<region_id>")
+def dashboard(region_id=DEFAULT_REGION):
+    region = regions.get(region_id)
+    if region is None or region_id not in SERVE_REGIONS:
+        return "Unknown region", 404
+    return render_template_string(
+        DASHBOARD_HTML, region_id=region_id, center=region.center, zoom=region.zoom
+    )
 
 
-@app.route("/api/temperature", methods=["POST"])
-def receive_temp():
-    """IoT sensors push here. This will mainly be your Oakville devices."""
-    data = request.get_json(force=True)
+def parse_reading(data, default_loc=None):
+    """Validate a JSON reading; returns (sensor_id, temperature, location).
+
+    Raises ValueError for a missing/non-string sensor_id or a temperature
+    that isn't a finite number, so bad input never reaches the model.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("reading must be a JSON object")
+
     sid = data.get("sensor_id")
-    temp = data.get("temperature")
-    loc = data.get("location", "Unknown")
+    if not isinstance(sid, str) or not sid:
+        raise ValueError("missing sensor_id")
 
-    if sid in sensors:
-        s = sensors[sid]
-    else:
-        sensors[sid] = {
-            "id": sid,
-            "name": sid,
-            "city": loc,
-            "lat": None,
-            "lng": None,
-            "temperature": None,
-            "humidity": None,
-            "wind_speed": None,
-            "uv_index": None,
-            "pm2_5": None,
-            "pm10": None,
-            "aqi_us": None,
-            "fire_risk": None,
-            "last_update": None,
-        }
-        s = sensors[sid]
+    temp = data.get("temperature")
+    if isinstance(temp, bool):
+        raise ValueError("temperature must be a number")
+    try:
+        temp = float(temp)
+    except (TypeError, ValueError):
+        raise ValueError("temperature must be a number")
+    if not math.isfinite(temp):
+        raise ValueError("temperature must be a number")
+
+    loc = data.get("location", default_loc)
+    if loc is not None and not isinstance(loc, str):
+        loc = str(loc)
+    return sid, temp, loc
+
+
+# readings applied to / refused by the model since startup; read back by
+# IoT.py --bench through /api/ingest to score what actually arrived
+ingest_counts = {"applied": 0, "dropped": 0}
+ingest_lock = threading.Lock()
+
+
+def count_ingest(key):
+    with ingest_lock:
+        ingest_counts[key] += 1
+
+
+def update_sensor_reading(sid, temp, loc=None, region_id=None):
+    """Apply one device reading to the sensor model.
+
+    Returns None, without applying it, if the sensor belongs to a region
+    this process doesn't serve (or to another region than region_id).
+    New devices join region_id, or the default region.
+    """
+    s = sensors.get(sid)
+    if s is None:
+        region = region_id or DEFAULT_REGION
+        if sid in registry.stations or region not in SERVE_REGIONS:
+            # registered in, or headed for, a shard another worker serves
+            count_ingest("dropped")
+            return None
+        s = add_sensor(new_sensor(sid, city=loc, region=region))
+    elif region_id is not None and s["region"] != region_id:
+        count_ingest("dropped")
+        return None
 
     s["temperature"] = temp
-    s["city"] = loc
+    if loc is not None:
+        s["city"] = loc
     s["last_update"] = datetime.utcnow().isoformat()
+    history.record(sid, temp)
+    regions[s["region"]].invalidate()
+    count_ingest("applied")
+    return s
+
+
+def apply_frames(payload, region_id=None):
+    """Apply a batch of compact binary readings (see frames.py)."""
+    readings = list(decode_frames(payload))
+
+    # devices send their registry frame_index instead of their id string
+    frame_ids = registry.frame_ids
+    accepted = 0
+    for index, temp in readings:
+        if index >= len(frame_ids) or frame_ids[index] is None or temp is None:
+            continue
+        if update_sensor_reading(frame_ids[index], temp, region_id=region_id):
+            accepted += 1
+    return accepted
+
+
+def receive_frames(payload, region_id=None):
+    try:
+        accepted = apply_frames(payload, region_id)
+    except FrameError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    return jsonify({"success": True, "accepted": accepted})
+
+
+def ingest_datagram(payload):
+    """UDP ingest: a JSON reading or one or more binary frames.
+
+    Readings for sensors outside SERVE_REGIONS are dropped; their devices
+    should send to the worker that serves them.
+    """
+    if payload[:1] == b"{":
+        update_sensor_reading(*parse_reading(json.loads(bytes(payload))))
+    else:
+        apply_frames(payload)
+
+
+@app.route("/api/temperature", methods=["POST"])
+@app.route("/api/<region_id>/temperature", methods=["POST"])
+def receive_temp(region_id=None):
+    """IoT sensors push here. This will mainly be your Oakville devices.
+
+    With SERVE_REGIONS set, devices post to /api/<region>/temperature on the
+    worker serving their region; a reading for a sensor this worker doesn't
+    serve is refused with 421 rather than kept where no GET will see it.
+    """
+    if region_id is not None and (region_id not in regions or region_id not in SERVE_REGIONS):
+        return jsonify({"success": False, "error": "unknown region"}), 404
+
+    if request.mimetype == FRAME_CONTENT_TYPE:
+        return receive_frames(request.get_data(cache=False), region_id)
+
+    data = request.get_json(force=True)
+    try:
+        sid, temp, loc = parse_reading(data, default_loc="Unknown")
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    if update_sensor_reading(sid, temp, loc, region_id) is None:
+        return jsonify({"success": False,
+                        "error": f"sensor {sid} is not served here"}), 421
 
     print(f"[IoT] {sid} @ {loc}: {temp}°C")
     return jsonify({"success": True})
 
 
 @app.route("/api/temperature", methods=["GET"])
-def get_temps():
-    global last_refresh
-    now = datetime.utcnow()
-
-    # refresh external APIs at most every 5 minutes
-    if last_refresh is None or (now - last_refresh).total_seconds() > 300:
-        refresh_live_data()
-        last_refresh = now
-
-    return jsonify({"sensors": list(sensors.values())})
+@app.route("/api/<region_id>/temperature", methods=["GET"])
+def get_temps(region_id=DEFAULT_REGION):
+    region = regions.get(region_id)
+    if region is None or region_id not in SERVE_REGIONS:
+        return jsonify({"success": False, "error": "unknown region"}), 404
+
+    # external APIs are refreshed by the region's pacer thread; this request
+    # is always served the cached snapshot
+    region.mark_viewed(time.time())
+    ensure_pacer(region)
+
+    body = region.snapshot(
+        lambda ss: json.dumps({"region": region_id, "sensors": ss})
+    )
+    return app.response_class(body, mimetype="application/json")
+
+
+@app.route("/api/history", methods=["GET"])
+@app.route("/api/<region_id>/history", methods=["GET"])
+def get_history(region_id=DEFAULT_REGION):
+    """Downsampled 24 h temperature series for many sensors in one call.
+
+    ?ids=a,b,c limits the sensors (default: the whole region),
+    ?points=N sets the series length (default 96, i.e. 15 min buckets).
+    """
+    region = regions.get(region_id)
+    if region is None or region_id not in SERVE_REGIONS:
+        return jsonify({"success": False, "error": "unknown region"}), 404
+
+    now = time.time()
+    points = request.args.get("points", history.buckets, type=int)
+
+    def build(sids):
+        return history.downsample_json(sids, points, now, region=region_id)
+
+    ids = request.args.get("ids")
+    if ids:
+        sids = [sid for sid in ids.split(",") if sid in region.sensors]
+        region.mark_viewed(now, sids)
+        body = build(sids)
+    else:
+        region.mark_viewed(now)
+        # whole-region body is cached until the next reading in the region
+        # or the next bucket step, like the sensor snapshot
+        key = ("history", points, history.current_bucket(now))
+        body = region.cached(key, lambda: build(list(region.sensors)))
+    return app.response_class(body, mimetype="application/json")
+
+
+@app.route("/api/upstream", methods=["GET"])
+@app.route("/api/<region_id>/upstream", methods=["GET"])
+def get_upstream(region_id=DEFAULT_REGION):
+    """Upstream budget state and the sensors currently served stale."""
+    region = regions.get(region_id)
+    if region is None or region_id not in SERVE_REGIONS:
+        return jsonify({"success": False, "error": "unknown region"}), 404
+
+    return jsonify({
+        "region": region_id,
+        "hosts": upstream_budget.status(),
+        "region_tokens": round(region.budget.available(), 2),
+        "stale": stale_sensors(region, time.time()),
+    })
+
+
+@app.route("/api/ingest", methods=["GET"])
+def get_ingest():
+    """Ingest counters since startup, so senders can check what arrived."""
+    stats = dict(ingest_counts)
+    if udp_listener is not None:
+        stats["udp"] = {"received": udp_listener.received, "errors": udp_listener.errors}
+    return jsonify(stats)
 
 
 # ------------------------------
 # RUN
 # ------------------------------
+# optional UDP listener next to the HTTP endpoint, e.g. UDP_INGEST_PORT=5001
+UDP_INGEST_PORT = os.environ.get("UDP_INGEST_PORT")
+udp_listener = None
+
 if __name__ == "__main__":
+    # with debug=True the reloader runs this file twice; only the child
+    # process (WERKZEUG_RUN_MAIN) serves requests, so start threads there
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        registry.watch(apply_registry_diff)
+        snapshots = SnapshotWriter(SNAPSHOT_PATH, collect_state, SNAPSHOT_INTERVAL).start()
+        # the reloader exits the child via sys.exit, so this also runs on
+        # every code-change restart
+        atexit.register(snapshots.save)
+        if UDP_INGEST_PORT:
+            udp_listener = UdpIngestListener(ingest_datagram, port=int(UDP_INGEST_PORT)).start()
+            print(f"UDP ingest listening on 0.0.0.0:{UDP_INGEST_PORT}")
+
     print("Dashboard running at http://0.0.0.0:5000")
     app.run(host="0.0.0.0",port=5000, debug=True)
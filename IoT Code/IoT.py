@@ -1,15 +1,34 @@
 import requests
+import socket
+import sys
 import time
 import random
 
-API_URL = "http://localhost:5000/api/temperature"
+from frames import FRAME_CONTENT_TYPE, encode_frame
+
+# region-scoped route, so the reading reaches the worker serving this region
+SENSOR_REGION = "gta"
+API_URL = f"http://localhost:5000/api/{SENSOR_REGION}/temperature"
+UDP_ADDR = ("localhost", 5001)
+
+# pass --binary to send compact frames (see frames.py) instead of JSON
+USE_BINARY_FRAME = "--binary" in sys.argv
+SENSOR_ID = "oakville-1"
+SENSOR_INDEX = 0
 
 def send_temperature():
     # Simulate temperature reading (15°C to 45°C)
     temp = round(random.uniform(15, 45), 1)
     
     try:
-        response = requests.post(API_URL, json={'temperature': temp})
+        if USE_BINARY_FRAME:
+            response = requests.post(
+                API_URL,
+                data=encode_frame([(SENSOR_INDEX, temp)]),
+                headers={'Content-Type': FRAME_CONTENT_TYPE},
+            )
+        else:
+            response = requests.post(API_URL, json={'sensor_id': SENSOR_ID, 'temperature': temp})
         if response.status_code == 200:
             print(f"Sent: {temp}°C")
         else:
@@ -17,9 +36,91 @@ def send_temperature():
     except Exception as e:
         print(f"Failed to send: {e}")
 
+# ------------------------------
+# THROUGHPUT BENCHMARK
+# ------------------------------
+# python IoT.py --bench 5000
+# Compares HTTP/JSON, HTTP/binary and UDP ingest. Run a separate dashboard
+# on the benchmark registry so production sensors are untouched:
+#
+#   SENSOR_REGISTRY=bench_stations.csv SNAPSHOT_PATH=bench.snapshot.gz \
+#   UDP_INGEST_PORT=5001 python Dashboard.py
+#
+# Each run is scored by the readings the dashboard actually applied
+# (/api/ingest), not by how fast the client could send them.
+
+INGEST_URL = "http://localhost:5000/api/ingest"
+BENCH_SENSOR_ID = "bench-1"
+BENCH_SENSOR_INDEX = 0
+BENCH_LOCATION = "Benchmark"
+
+
+def applied_count(session):
+    return session.get(INGEST_URL).json()["applied"]
+
+
+def wait_for_applied(session, base, count, timeout=30, settle=1.0):
+    """Poll until `count` readings past `base` are applied, or none arrive
+    for `settle` seconds. Returns (applied, time of the last progress)."""
+    deadline = time.perf_counter() + timeout
+    applied, progressed = 0, time.perf_counter()
+    while True:
+        now = time.perf_counter()
+        current = applied_count(session) - base
+        if current != applied:
+            applied, progressed = current, now
+        if applied >= count or now - progressed > settle or now > deadline:
+            return applied, progressed
+        time.sleep(0.01)
+
+
+def bench(count):
+    session = requests.Session()
+    # first GET pays for the upstream refresh; keep it out of the timings
+    session.get(API_URL)
+
+    temps = [round(random.uniform(15, 45), 1) for _ in range(count)]
+
+    def http_json():
+        for t in temps:
+            session.post(API_URL, json={'sensor_id': BENCH_SENSOR_ID, 'temperature': t,
+                                        'location': BENCH_LOCATION})
+
+    def http_binary():
+        for t in temps:
+            session.post(
+                API_URL,
+                data=encode_frame([(BENCH_SENSOR_INDEX, t)]),
+                headers={'Content-Type': FRAME_CONTENT_TYPE},
+            )
+
+    def udp_binary():
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for t in temps:
+            sock.sendto(encode_frame([(BENCH_SENSOR_INDEX, t)]), UDP_ADDR)
+        sock.close()
+
+    for name, run in [("http/json", http_json),
+                      ("http/binary", http_binary),
+                      ("udp/binary", udp_binary)]:
+        base = applied_count(session)
+        start = time.perf_counter()
+        run()
+        applied, done = wait_for_applied(session, base, count)
+        elapsed = done - start
+        lost = count - applied
+        status = f" ({lost} of {count} lost)" if lost else ""
+        print(f"{name:12s} {applied} readings in {elapsed:.2f}s "
+              f"-> {applied / elapsed:,.0f} readings/s{status}")
+
+
 if __name__ == '__main__':
+    if "--bench" in sys.argv:
+        bench(int(sys.argv[sys.argv.index("--bench") + 1]))
+        sys.exit()
+
     print("IoT Device Starting...")
-    print(f"Sending to: {API_URL}")
+    print(f"Sending to: {API_URL} ({'binary' if USE_BINARY_FRAME else 'json'})")
     print("Sending temperature every 10 seconds...\n")
     
     while True:
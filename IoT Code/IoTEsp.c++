@@ -12,8 +12,14 @@ const char* password = "PASSWORD";
 // Server URL - Your dashboard IP
 const char* serverURL = "http://192.168.2.23:5000/api/temperature";
 // Sensor Information - CUSTOMIZE THIS FOR EACH SENSOR
-const char* sensorID = "sensor01";
+// sensorID and sensorIndex must match the same row of the registry
+// (stations.csv: id, frame_index), so both modes report as one sensor
+const char* sensorID = "oakville-1";
 const char* sensorLocation = "Sheridan Forest Oakville";
+// Compact binary frame (see frames.py) - set to 1 to send 8 bytes per reading
+// instead of JSON. sensorIndex is this station's frame_index in the registry.
+#define USE_BINARY_FRAME 0
+const uint16_t sensorIndex = 0;
 // Timing
 unsigned long lastSendTime = 0;
 const unsigned long sendInterval = 10000; // 10 seconds
@@ -87,9 +93,24 @@ void sendTemperature() {
   
   HTTPClient http;
   http.begin(serverURL);
-  http.addHeader("Content-Type", "application/json");
   http.setTimeout(5000); // 5 second timeout
   
+#if USE_BINARY_FRAME
+  // Header: "GG", version 1, record count 1
+  // Record: uint16 sensor index, int16 temperature in tenths of a degree
+  int16_t scaled = (int16_t)lround(temp * 10.0);
+  uint8_t frame[8] = {
+    'G', 'G', 1, 1,
+    (uint8_t)(sensorIndex & 0xFF), (uint8_t)(sensorIndex >> 8),
+    (uint8_t)(scaled & 0xFF), (uint8_t)((uint16_t)scaled >> 8)
+  };
+  http.addHeader("Content-Type", "application/octet-stream");
+  
+  // Send POST request
+  int httpResponseCode = http.POST(frame, sizeof(frame));
+#else
+  http.addHeader("Content-Type", "application/json");
+  
   // Create JSON payload with sensor info
   StaticJsonDocument<300> doc;
   doc["temperature"] = temp;
@@ -101,6 +122,7 @@ void sendTemperature() {
   
   // Send POST request
   int httpResponseCode = http.POST(jsonString);
+#endif
   
   if (httpResponseCode == 200) {
     Serial.println("✓ Sent successfully");
@@ -0,0 +1,339 @@
+import argparse
+import math
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+from fire_risk import LEVEL_CODES, LEVEL_NAMES, classify_fire_risk_array
+from registry import load_stations
+
+# ------------------------------
+# FIRE-RISK BACKTEST
+# ------------------------------
+#
+# Replays archived hourly series through the dashboard's fire-risk rules and
+# alert logic, then checks the alerts against NASA FIRMS detections:
+#
+#   python backtest.py series/*.parquet --firms fire_archive_SV-C2.csv
+#
+# Series files (CSV or Parquet) need the columns
+#   time, station, temperature, humidity, wind_speed
+# and optionally aqi_us, lat, lng. Without lat/lng the coordinates come from
+# the sensor registry (--stations). Files are streamed in record batches
+# (Parquet is memory-mapped), so only one chunk is resident at a time.
+#
+# FIRMS archives are the standard CSV download (latitude, longitude,
+# acq_date, acq_time).
+
+CHUNK_ROWS = 1_000_000
+REQUIRED_COLUMNS = ("time", "station", "temperature", "humidity", "wind_speed")
+EARTH_RADIUS_KM = 6371.0
+
+# same alert rule as the dashboard: fire risk High/Extreme or temp >= 35
+ALERT_LEVEL = LEVEL_CODES["High"]
+ALERT_TEMP = 35
+
+
+def _open_csv(path, block_size):
+    return pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        # empty cells are missing values, not "" station ids
+        convert_options=pacsv.ConvertOptions(strings_can_be_null=True),
+    )
+
+
+def _check_columns(path, schema):
+    missing = [c for c in REQUIRED_COLUMNS if schema.get_field_index(c) < 0]
+    if missing:
+        raise ValueError(f"{path}: missing column(s) {', '.join(missing)}")
+
+
+def check_series(path):
+    """Raise ValueError if a series file lacks a required column.
+
+    Only the schema is read (the Parquet footer, or the first CSV block).
+    """
+    if path.endswith(".parquet"):
+        schema = pq.read_schema(path, memory_map=True)
+    else:
+        schema = _open_csv(path, 1 << 20).schema
+    _check_columns(path, schema)
+
+
+def iter_series(paths, chunk_rows=CHUNK_ROWS):
+    """Yield record batches from each series file, in the order given."""
+    for path in paths:
+        if path.endswith(".parquet"):
+            reader = pq.ParquetFile(path, memory_map=True)
+            _check_columns(path, reader.schema_arrow)
+            yield from reader.iter_batches(batch_size=chunk_rows)
+        else:
+            # CSV block size is in bytes; hourly rows are roughly 64 bytes
+            reader = _open_csv(path, chunk_rows * 64)
+            _check_columns(path, reader.schema)
+            yield from reader
+
+
+def _floats(batch, name):
+    idx = batch.schema.get_field_index(name)
+    if idx < 0:
+        return None
+    return pc.cast(batch.column(idx), pa.float64()).to_numpy(zero_copy_only=False)
+
+
+def _hours(column):
+    """Timestamps (or ISO strings) as int64 hours since the epoch."""
+    if pa.types.is_timestamp(column.type):
+        column = pc.cast(column, pa.timestamp("s", tz=column.type.tz))
+    else:
+        # ISO strings are parsed by Arrow; zoned ones ("...Z", "-04:00")
+        # only parse as a tz-aware type
+        try:
+            column = pc.cast(column, pa.timestamp("s"))
+        except pa.ArrowInvalid:
+            column = pc.cast(column, pa.timestamp("s", tz="UTC"))
+    secs = column.to_numpy(zero_copy_only=False).astype("datetime64[s]")
+    return secs.astype(np.int64) // 3600
+
+
+class StationIndex:
+    """Map station ids to dense integer codes, keeping their coordinates."""
+
+    def __init__(self, registry=None):
+        self.ids = []
+        self.codes = {}
+        self.lat = []
+        self.lng = []
+        self.registry = registry or {}
+
+    def encode(self, column, lat=None, lng=None):
+        # null ids have no code; run_backtest filters those rows beforehand
+        if column.null_count:
+            raise ValueError("station column contains nulls")
+        encoded = pc.dictionary_encode(column)
+        lut = np.array([self._code(sid) for sid in encoded.dictionary.to_pylist()],
+                       dtype=np.int64)
+        codes = lut[encoded.indices.to_numpy(zero_copy_only=False)]
+
+        if lat is not None and lng is not None:
+            # first row of each station in this chunk fills missing coordinates
+            uniq, first = np.unique(codes, return_index=True)
+            for code, row in zip(uniq, first):
+                if math.isnan(self.lat[code]):
+                    self.lat[code] = lat[row]
+                    self.lng[code] = lng[row]
+        return codes
+
+    def _code(self, sid):
+        code = self.codes.get(sid)
+        if code is None:
+            code = self.codes[sid] = len(self.ids)
+            self.ids.append(sid)
+            st = self.registry.get(sid, {})
+            self.lat.append(st.get("lat") if st.get("lat") is not None else math.nan)
+            self.lng.append(st.get("lng") if st.get("lng") is not None else math.nan)
+        return code
+
+
+def load_firms(path):
+    """FIRMS archive CSV -> (lat, lng, hour) arrays."""
+    table = pacsv.read_csv(
+        path,
+        convert_options=pacsv.ConvertOptions(
+            include_columns=["latitude", "longitude", "acq_date", "acq_time"],
+            column_types={"acq_date": pa.date32(), "acq_time": pa.int32()},
+        ),
+    )
+    days = table.column("acq_date").to_numpy().astype("datetime64[D]").astype(np.int64)
+    hhmm = table.column("acq_time").to_numpy()
+    return (
+        table.column("latitude").to_numpy(),
+        table.column("longitude").to_numpy(),
+        days * 24 + hhmm // 100,
+    )
+
+
+def _pair_key(codes, hours):
+    # one sortable int64 per (station, hour)
+    return (codes.astype(np.int64) << 32) | hours.astype(np.int64)
+
+
+def match_fires(stations, fire_lat, fire_lng, radius_km):
+    """(fire index, station code) pairs closer than radius_km."""
+    order = np.argsort(fire_lat)
+    sorted_lat = fire_lat[order]
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+
+    pair_fire, pair_station = [], []
+    for code, (lat, lng) in enumerate(zip(stations.lat, stations.lng)):
+        if math.isnan(lat):
+            continue
+        lo, hi = np.searchsorted(sorted_lat, [lat - dlat, lat + dlat])
+        cand = order[lo:hi]
+        if not len(cand):
+            continue
+        p1, p2 = math.radians(lat), np.radians(fire_lat[cand])
+        dp = p2 - p1
+        dl = np.radians(fire_lng[cand] - lng)
+        a = np.sin(dp / 2) ** 2 + math.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+        near = cand[2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a)) <= radius_km]
+        pair_fire.append(near)
+        pair_station.append(np.full(len(near), code, dtype=np.int64))
+
+    if not pair_fire:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    return np.concatenate(pair_fire), np.concatenate(pair_station)
+
+
+def run_backtest(series_paths, firms_path, stations_path=None,
+                 radius_km=25.0, lead_hours=24, chunk_rows=CHUNK_ROWS):
+    started = time.perf_counter()
+    stations = StationIndex(load_stations(stations_path) if stations_path else None)
+
+    rows = 0
+    skipped = 0
+    level_counts = np.zeros(len(LEVEL_NAMES), dtype=np.int64)
+    alert_codes, alert_hours = [], []
+    first_hour, last_hour = None, None
+
+    # ---- stream series, score every row, keep only alert hours ----
+    for batch in iter_series(series_paths, chunk_rows):
+        # rows without a time or station can't be placed; drop them up front
+        valid = pc.and_(
+            pc.is_valid(batch.column(batch.schema.get_field_index("time"))),
+            pc.is_valid(batch.column(batch.schema.get_field_index("station"))),
+        )
+        kept = batch.filter(valid)
+        skipped += batch.num_rows - kept.num_rows
+        batch = kept
+        if batch.num_rows == 0:
+            continue
+        hours = _hours(batch.column(batch.schema.get_field_index("time")))
+        codes = stations.encode(
+            batch.column(batch.schema.get_field_index("station")),
+            _floats(batch, "lat"), _floats(batch, "lng"),
+        )
+        temp = _floats(batch, "temperature")
+        levels = classify_fire_risk_array(
+            temp, _floats(batch, "humidity"), _floats(batch, "wind_speed"),
+            _floats(batch, "aqi_us"),
+        )
+
+        rows += batch.num_rows
+        level_counts += np.bincount(levels + 1, minlength=len(LEVEL_NAMES))
+        lo, hi = hours.min(), hours.max()
+        first_hour = lo if first_hour is None else min(first_hour, lo)
+        last_hour = hi if last_hour is None else max(last_hour, hi)
+
+        alert = (levels >= ALERT_LEVEL) | (temp >= ALERT_TEMP)
+        alert_codes.append(codes[alert])
+        alert_hours.append(hours[alert])
+
+    if rows == 0:
+        raise ValueError("no series rows to replay")
+
+    alert_keys = np.unique(_pair_key(
+        np.concatenate(alert_codes), np.concatenate(alert_hours)
+    ))
+
+    # ---- alert episodes: consecutive alert hours at one station ----
+    ep_station = alert_keys >> 32
+    ep_hour = alert_keys & 0xFFFFFFFF
+    breaks = np.flatnonzero((np.diff(ep_station) != 0) | (np.diff(ep_hour) != 1)) + 1
+    if len(alert_keys):
+        ep_first = np.concatenate(([0], breaks))
+        ep_last = np.append(breaks - 1, len(alert_keys) - 1)
+    else:
+        ep_first = ep_last = breaks
+
+    # ---- fires near stations during the replayed period ----
+    # fires up to lead_hours past the end still follow the last alerts;
+    # only those inside the period are scored as hits or misses
+    fire_lat, fire_lng, fire_hour = load_firms(firms_path)
+    in_range = (fire_hour >= first_hour) & (fire_hour <= last_hour + lead_hours)
+    fire_lat, fire_lng, fire_hour = fire_lat[in_range], fire_lng[in_range], fire_hour[in_range]
+    pair_fire, pair_station = match_fires(stations, fire_lat, fire_lng, radius_km)
+    pair_hour = fire_hour[pair_fire]
+    in_period = fire_hour <= last_hour
+
+    # a fire is a hit if a nearby station alerted within lead_hours before it
+    lo = np.searchsorted(alert_keys, _pair_key(pair_station, pair_hour - lead_hours), "left")
+    hi = np.searchsorted(alert_keys, _pair_key(pair_station, pair_hour), "right")
+    fire_hit = np.zeros(len(fire_hour), dtype=bool)
+    fire_hit[pair_fire[hi > lo]] = True
+    fire_hit &= in_period
+    covered = np.zeros(len(fire_hour), dtype=bool)
+    covered[pair_fire] = True
+    covered &= in_period
+
+    # an episode is a false alarm if no nearby fire followed within lead_hours
+    fire_keys = np.sort(_pair_key(pair_station, pair_hour))
+    lo = np.searchsorted(fire_keys, alert_keys[ep_first], "left")
+    hi = np.searchsorted(
+        fire_keys, _pair_key(ep_station[ep_last], ep_hour[ep_last] + lead_hours), "right"
+    )
+
+    hits = int(fire_hit.sum())
+    n_covered = int(covered.sum())
+    return {
+        "rows": rows,
+        "skipped": skipped,
+        "stations": len(stations.ids),
+        "first_hour": np.datetime64(int(first_hour), "h"),
+        "last_hour": np.datetime64(int(last_hour), "h"),
+        "levels": {LEVEL_NAMES[code - 1]: int(n)
+                   for code, n in enumerate(level_counts)},
+        "alert_hours": len(alert_keys),
+        "alert_episodes": len(ep_first),
+        "false_alarms": int((hi <= lo).sum()),
+        "fires": int(in_period.sum()),
+        "fires_covered": n_covered,
+        "hits": hits,
+        "misses": n_covered - hits,
+        "hit_rate": hits / n_covered if n_covered else None,
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def print_report(r):
+    print(f"Replayed {r['rows']:,} rows for {r['stations']} stations "
+          f"({r['first_hour']} .. {r['last_hour']}) in {r['elapsed']:.2f}s")
+    if r["skipped"]:
+        print(f"Skipped {r['skipped']:,} rows without a time or station")
+    print("Risk levels: " + ", ".join(f"{k} {v:,}" for k, v in r["levels"].items()))
+    print(f"Alerts: {r['alert_hours']:,} hours in {r['alert_episodes']:,} episodes, "
+          f"{r['false_alarms']:,} with no fire following")
+    rate = f"{r['hit_rate']:.1%}" if r["hit_rate"] is not None else "n/a"
+    print(f"FIRMS: {r['fires']:,} detections in period, {r['fires_covered']:,} near a station")
+    print(f"  hits {r['hits']:,}  misses {r['misses']:,}  hit rate {rate}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest fire-risk alerts against FIRMS.")
+    parser.add_argument("series", nargs="+", help="time-ordered CSV/Parquet series files")
+    parser.add_argument("--firms", required=True, help="FIRMS archive CSV")
+    parser.add_argument("--stations", help="registry file for station coordinates")
+    parser.add_argument("--radius-km", type=float, default=25.0)
+    parser.add_argument("--lead-hours", type=int, default=24)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    missing = [p for p in args.series + [args.firms] if not os.path.exists(p)]
+    if missing:
+        parser.error(f"file not found: {', '.join(missing)}")
+    for path in args.series:
+        try:
+            check_series(path)
+        except ValueError as e:
+            parser.error(str(e))
+
+    print_report(run_backtest(
+        args.series, args.firms, args.stations,
+        radius_km=args.radius_km, lead_hours=args.lead_hours, chunk_rows=args.chunk_rows,
+    ))
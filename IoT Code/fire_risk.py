@@ -0,0 +1,85 @@
+# ------------------------------
+# FIRE RISK RULES
+# ------------------------------
+#
+# Shared by the dashboard (one sensor at a time) and backtest.py (whole
+# arrays at once), so both always score with the same thresholds.
+
+# (threshold, points): first match wins
+TEMP_POINTS = [(35, 3), (30, 2), (25, 1)]          # temp >= threshold
+HUMIDITY_POINTS = [(25, 3), (40, 2), (60, 1)]      # humidity <= threshold
+WIND_POINTS = [(30, 3), (20, 2), (10, 1)]          # wind_speed >= threshold
+AQI_POINTS = [(150, 2), (100, 1)]                  # aqi >= threshold
+
+# (minimum score, level), highest first; anything below is "Low"
+RISK_LEVELS = [(8, "Extreme"), (6, "High"), (3, "Moderate")]
+
+# level codes used by the vectorized scorer; -1 means "Unknown"
+LEVEL_CODES = {"Low": 0, "Moderate": 1, "High": 2, "Extreme": 3}
+LEVEL_NAMES = {code: name for name, code in LEVEL_CODES.items()}
+LEVEL_NAMES[-1] = "Unknown"
+
+
+def _points_at_least(value, table):
+    for threshold, points in table:
+        if value >= threshold:
+            return points
+    return 0
+
+
+def _points_at_most(value, table):
+    for threshold, points in table:
+        if value <= threshold:
+            return points
+    return 0
+
+
+def classify_fire_risk(temp, humidity, wind_speed, aqi):
+    """Simple custom fire-risk logic for the dashboard."""
+    if temp is None or humidity is None or wind_speed is None:
+        return "Unknown"
+
+    risk_score = (
+        _points_at_least(temp, TEMP_POINTS)
+        + _points_at_most(humidity, HUMIDITY_POINTS)
+        + _points_at_least(wind_speed, WIND_POINTS)
+    )
+    if aqi is not None:
+        risk_score += _points_at_least(aqi, AQI_POINTS)
+
+    for min_score, level in RISK_LEVELS:
+        if risk_score >= min_score:
+            return level
+    return "Low"
+
+
+def classify_fire_risk_array(temp, humidity, wind_speed, aqi=None):
+    """Vectorized classify_fire_risk over numpy arrays (NaN = missing).
+
+    Returns an int8 array of LEVEL_CODES, with -1 where the level is Unknown.
+    """
+    import numpy as np
+
+    def at_least(x, table):
+        return np.select([x >= t for t, _ in table], [p for _, p in table], 0)
+
+    def at_most(x, table):
+        return np.select([x <= t for t, _ in table], [p for _, p in table], 0)
+
+    score = (
+        at_least(temp, TEMP_POINTS)
+        + at_most(humidity, HUMIDITY_POINTS)
+        + at_least(wind_speed, WIND_POINTS)
+    )
+    if aqi is not None:
+        # NaN compares False everywhere, so a missing AQI adds nothing
+        score = score + at_least(aqi, AQI_POINTS)
+
+    levels = np.select(
+        [score >= s for s, _ in RISK_LEVELS],
+        [LEVEL_CODES[name] for _, name in RISK_LEVELS],
+        LEVEL_CODES["Low"],
+    ).astype(np.int8)
+    unknown = np.isnan(temp) | np.isnan(humidity) | np.isnan(wind_speed)
+    levels[unknown] = -1
+    return levels
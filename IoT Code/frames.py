@@ -0,0 +1,79 @@
+import struct
+
+# ------------------------------
+# COMPACT BINARY READING FRAMES
+# ------------------------------
+#
+# Frame layout (little-endian):
+#
+#   header:  2s magic b"GG" | B version | B count
+#   record:  H sensor index | h temperature in tenths of a degree C
+#
+# A batch of N readings is 4 + 4*N bytes, compared with ~80 bytes of JSON
+# per reading. A temperature of -32768 means "no reading".
+
+FRAME_MAGIC = b"GG"
+FRAME_VERSION = 1
+FRAME_CONTENT_TYPE = "application/octet-stream"
+
+HEADER = struct.Struct("<2sBB")
+RECORD = struct.Struct("<Hh")
+
+TEMP_SCALE = 10
+TEMP_MISSING = -32768
+MAX_RECORDS = 255
+MAX_SENSOR_INDEX = 65535  # RECORD "H"
+
+
+class FrameError(ValueError):
+    """Raised when a payload is not a valid reading frame."""
+
+
+def encode_frame(readings):
+    """Pack [(sensor_index, temperature_c), ...] into one frame."""
+    readings = list(readings)
+    if len(readings) > MAX_RECORDS:
+        raise FrameError(f"too many records: {len(readings)} > {MAX_RECORDS}")
+
+    buf = bytearray(HEADER.size + RECORD.size * len(readings))
+    HEADER.pack_into(buf, 0, FRAME_MAGIC, FRAME_VERSION, len(readings))
+    offset = HEADER.size
+    for index, temp in readings:
+        if not 0 <= index <= MAX_SENSOR_INDEX:
+            raise FrameError(f"sensor index out of range: {index}")
+        if temp is None:
+            raw = TEMP_MISSING
+        else:
+            raw = int(round(temp * TEMP_SCALE))
+            if not TEMP_MISSING < raw <= 32767:
+                raise FrameError(f"temperature out of range: {temp}")
+        RECORD.pack_into(buf, offset, index, raw)
+        offset += RECORD.size
+    return bytes(buf)
+
+
+def decode_frames(payload):
+    """Yield (sensor_index, temperature_c) from one or more concatenated frames.
+
+    The payload is walked through a memoryview, so records are unpacked in
+    place without slicing copies of the request body.
+    """
+    view = memoryview(payload).cast("B")
+    offset = 0
+    end = len(view)
+    while offset < end:
+        if end - offset < HEADER.size:
+            raise FrameError("truncated frame header")
+        magic, version, count = HEADER.unpack_from(view, offset)
+        if magic != FRAME_MAGIC:
+            raise FrameError("bad frame magic")
+        if version != FRAME_VERSION:
+            raise FrameError(f"unsupported frame version: {version}")
+        offset += HEADER.size
+
+        body_end = offset + count * RECORD.size
+        if body_end > end:
+            raise FrameError("truncated frame body")
+        for index, raw in RECORD.iter_unpack(view[offset:body_end]):
+            yield index, (None if raw == TEMP_MISSING else raw / TEMP_SCALE)
+        offset = body_end
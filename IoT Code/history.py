@@ -0,0 +1,206 @@
+import base64
+import json
+import time
+from array import array
+
+# ------------------------------
+# ROLLING SENSOR HISTORY
+# ------------------------------
+#
+# Each sensor keeps a fixed ring of time buckets (by default 96 x 15 min =
+# the last 24 h). A reading only touches its own bucket (min / max / sum /
+# count), so recording is O(1). Each ring also caches its last downsampled
+# series until its next reading, so a whole-fleet sparkline query only
+# recomputes the sensors that changed (or all of them once per bucket step).
+
+WINDOW_SECONDS = 24 * 3600
+BUCKETS = 96
+
+RING_FIELDS = ("bucket", "lo", "hi", "total", "count")
+
+
+class RingSeries:
+    """Min/max/mean buckets for one sensor over a rolling window."""
+
+    __slots__ = ("step", "size", "bucket", "lo", "hi", "total", "count", "cache")
+
+    def __init__(self, step, size):
+        self.step = step
+        self.size = size
+        self.bucket = array("q", [-1]) * size   # absolute bucket number per slot
+        self.lo = array("d", [0.0]) * size
+        self.hi = array("d", [0.0]) * size
+        self.total = array("d", [0.0]) * size
+        self.count = array("l", [0]) * size
+        self.cache = None   # (last_bucket, factor, result, json) of the last downsample
+
+    def add(self, value, ts):
+        self.cache = None
+        b = int(ts // self.step)
+        i = b % self.size
+        if self.bucket[i] != b:
+            # slot still holds an older bucket: recycle it
+            self.bucket[i] = b
+            self.lo[i] = self.hi[i] = value
+            self.total[i] = value
+            self.count[i] = 1
+            return
+        if value < self.lo[i]:
+            self.lo[i] = value
+        if value > self.hi[i]:
+            self.hi[i] = value
+        self.total[i] += value
+        self.count[i] += 1
+
+    def downsample(self, last_bucket, factor):
+        """(mean, min, max) lists for the window ending at last_bucket.
+
+        Every `factor` adjacent buckets are merged into one point; empty
+        points are None.
+        """
+        cache = self.cache
+        if cache is not None and cache[0] == last_bucket and cache[1] == factor:
+            return cache[2]
+
+        # rotate the slots into window order (oldest first) and mark the ones
+        # that still hold a bucket from this window
+        first = last_bucket - self.size + 1
+        s = first % self.size
+        buckets, lo, hi, total, count = (
+            a[s:] + a[:s] for a in (self.bucket.tolist(), self.lo.tolist(),
+                                    self.hi.tolist(), self.total.tolist(),
+                                    self.count.tolist())
+        )
+        live = [b == e for b, e in zip(buckets, range(first, last_bucket + 1))]
+
+        if factor == 1:
+            means = [round(t / c, 2) if ok else None
+                     for ok, t, c in zip(live, total, count)]
+            lows = [v if ok else None for ok, v in zip(live, lo)]
+            highs = [v if ok else None for ok, v in zip(live, hi)]
+        else:
+            means, lows, highs = [], [], []
+            for start in range(0, self.size, factor):
+                idx = [i for i in range(start, start + factor) if live[i]]
+                if not idx:
+                    means.append(None)
+                    lows.append(None)
+                    highs.append(None)
+                    continue
+                means.append(round(sum(total[i] for i in idx)
+                                   / sum(count[i] for i in idx), 2))
+                lows.append(min(lo[i] for i in idx))
+                highs.append(max(hi[i] for i in idx))
+        self.cache = (last_bucket, factor, (means, lows, highs), None)
+        return means, lows, highs
+
+    def downsample_json(self, last_bucket, factor):
+        """downsample() as an encoded JSON object, cached the same way."""
+        mean, lo, hi = self.downsample(last_bucket, factor)
+        cache = self.cache
+        if cache[3] is None:
+            encoded = json.dumps({"mean": mean, "min": lo, "max": hi})
+            self.cache = cache = cache[:3] + (encoded,)
+        return cache[3]
+
+
+class SensorHistory:
+    """Ring buffers for every sensor, keyed by sensor id."""
+
+    def __init__(self, window=WINDOW_SECONDS, buckets=BUCKETS):
+        self.window = window
+        self.buckets = buckets
+        self.step = window / buckets
+        self.series = {}
+
+    def record(self, sid, value, ts=None):
+        if value is None:
+            return
+        ring = self.series.get(sid)
+        if ring is None:
+            ring = self.series[sid] = RingSeries(self.step, self.buckets)
+        ring.add(float(value), time.time() if ts is None else ts)
+
+    def discard(self, sid):
+        self.series.pop(sid, None)
+
+    def dump(self):
+        """JSON-safe copy of every ring, arrays as base64 (for snapshot.py)."""
+        return {
+            "window": self.window,
+            "buckets": self.buckets,
+            "series": [
+                [sid] + [base64.b64encode(getattr(ring, f).tobytes()).decode("ascii")
+                         for f in RING_FIELDS]
+                for sid, ring in list(self.series.items())
+            ],
+        }
+
+    def load(self, data, keep=None):
+        """Restore rings from dump(); skipped if the bucket layout changed.
+
+        If keep is given, only rings for those sensor ids are restored.
+        """
+        if data.get("window") != self.window or data.get("buckets") != self.buckets:
+            return 0
+        restored = 0
+        for sid, *fields in data.get("series", []):
+            if keep is not None and sid not in keep:
+                continue
+            ring = RingSeries(self.step, self.buckets)
+            for name, encoded in zip(RING_FIELDS, fields):
+                arr = array(getattr(ring, name).typecode)
+                arr.frombytes(base64.b64decode(encoded))
+                if len(arr) != self.buckets:
+                    break
+                setattr(ring, name, arr)
+            else:
+                self.series[sid] = ring
+                restored += 1
+        return restored
+
+    def current_bucket(self, now=None):
+        return int((time.time() if now is None else now) // self.step)
+
+    def downsample(self, sids, points=BUCKETS, now=None):
+        """Fixed-size series for many sensors in one pass.
+
+        points is rounded so that it evenly groups the underlying buckets
+        (96 buckets -> 96, 48, 32, 24, ... points).
+        """
+        factor, last_bucket, data = self._layout(points, now)
+        out = {}
+        for sid in sids:
+            ring = self.series.get(sid)
+            if ring is None:
+                continue
+            mean, lo, hi = ring.downsample(last_bucket, factor)
+            out[sid] = {"mean": mean, "min": lo, "max": hi}
+        data["series"] = out
+        return data
+
+    def downsample_json(self, sids, points=BUCKETS, now=None, **extra):
+        """downsample() encoded as JSON, reusing each ring's cached encoding,
+        so a rebuild only re-encodes the sensors that changed."""
+        factor, last_bucket, data = self._layout(points, now)
+        data.update(extra)
+        parts = []
+        for sid in sids:
+            ring = self.series.get(sid)
+            if ring is None:
+                continue
+            parts.append(json.dumps(str(sid)) + ":" + ring.downsample_json(last_bucket, factor))
+        # splice the series object into the header object
+        return json.dumps(data)[:-1] + ', "series": {' + ",".join(parts) + "}}"
+
+    def _layout(self, points, now):
+        factor = max(1, self.buckets // max(1, points))
+        while self.buckets % factor:
+            factor += 1
+        last_bucket = self.current_bucket(now)
+        first_bucket = last_bucket - self.buckets + 1
+        return factor, last_bucket, {
+            "start": first_bucket * self.step,
+            "step": self.step * factor,
+            "points": self.buckets // factor,
+        }
@@ -0,0 +1,92 @@
+import json
+import os
+import threading
+
+from upstream import TokenBucket
+
+# ------------------------------
+# REGION PARTITIONS
+# ------------------------------
+#
+# Each region owns a shard of the sensors plus its own refresh schedule,
+# upstream request budget and cached API response, so a slow refresh or a
+# burst of readings in one region never touches another. A process can be
+# limited to a subset of regions (SERVE_REGIONS) to spread them over workers.
+
+DEFAULT_REGIONS = {
+    "gta": {
+        "name": "Greater Toronto Area",
+        "center": [43.6532, -79.3832],
+        "zoom": 9,
+    },
+}
+
+
+class Region:
+    """One partition of the sensor fleet."""
+
+    def __init__(self, rid, name=None, center=(43.6532, -79.3832), zoom=9,
+                 refresh_interval=300, max_upstream_requests=100):
+        self.id = rid
+        self.name = name or rid
+        self.center = tuple(center)
+        self.zoom = zoom
+        # target age of upstream data; sensors older than this are stale
+        self.refresh_interval = refresh_interval
+        # this region's share of upstream calls per refresh_interval
+        # (2 per sensor: weather + air), on top of the per-host budget
+        self.max_upstream_requests = max_upstream_requests
+        self.budget = TokenBucket(
+            max_upstream_requests / refresh_interval, max_upstream_requests
+        )
+
+        self.sensors = {}
+        self.refreshed_at = {}  # sensor id -> time.time() of last upstream refresh
+        self.last_viewed = None  # last time a client asked for the whole region
+        self.viewed_at = {}      # sensor id -> last time it was asked for by id
+        self.pacer = None
+        self.pacer_lock = threading.Lock()
+
+        self._version = 0
+        self._cache = {}
+
+    def mark_viewed(self, now, sids=None):
+        if sids is None:
+            self.last_viewed = now
+        else:
+            for sid in sids:
+                self.viewed_at[sid] = now
+
+    def is_viewed(self, sid, now, within):
+        seen = max(self.last_viewed or 0, self.viewed_at.get(sid, 0))
+        return now - seen <= within
+
+    def invalidate(self):
+        """Mark the cached response out of date (new reading or refresh)."""
+        self._version += 1
+
+    def cached(self, key, build):
+        """Response body for key, rebuilt with build() when invalidated."""
+        version = self._version
+        hit = self._cache.get(key)
+        if hit is not None and hit[0] == version:
+            return hit[1]
+        body = build()
+        # drop bodies from older versions so time-keyed entries don't pile up
+        self._cache = {k: v for k, v in self._cache.items() if v[0] == version}
+        self._cache[key] = (version, body)
+        return body
+
+    def snapshot(self, build):
+        """Cached sensor list body; rebuilt with build(sensors) when invalidated."""
+        return self.cached("sensors", lambda: build(list(self.sensors.values())))
+
+
+def load_regions(path):
+    """Read {region_id: Region} from a JSON file, or the built-in default."""
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    else:
+        config = DEFAULT_REGIONS
+    return {rid: Region(rid, **opts) for rid, opts in config.items()}
@@ -0,0 +1,203 @@
+import csv
+import json
+import os
+import sqlite3
+import threading
+from operator import itemgetter
+
+from frames import MAX_SENSOR_INDEX
+
+# ------------------------------
+# SENSOR REGISTRY
+# ------------------------------
+#
+# Station metadata (id, name, city, coordinates, optional binary frame
+# index and region) lives in a CSV, JSON or SQLite file instead of being hard-coded.
+# The file is parsed once into lookup indexes; a watcher thread re-reads it
+# when it changes and reports only the stations that were added, removed or
+# edited, so the caller can patch its live state without a full rebuild.
+
+STATION_FIELDS = ("id", "name", "city", "lat", "lng", "frame_index", "region")
+
+
+def _float_or_none(value):
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def _int_or_none(value):
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def _station(sid, name, city, lat, lng, frame_index, region):
+    return {
+        "id": sid,
+        "name": name or sid,
+        "city": city or "Unknown",
+        "lat": _float_or_none(lat),
+        "lng": _float_or_none(lng),
+        "frame_index": _int_or_none(frame_index),
+        "region": region or None,
+    }
+
+
+def _load_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        if "id" not in header:
+            raise ValueError(f"{path}: missing 'id' column")
+        # rows are cut/padded to the header width plus one empty sentinel
+        # cell, which is where missing columns read from
+        width = len(header)
+        pick = itemgetter(*(header.index(c) if c in header else width
+                            for c in STATION_FIELDS))
+        pad = [""] * (width + 1)
+        for row in reader:
+            if not row:
+                continue
+            row = row[:width] + pad[min(len(row), width):]
+            yield _station(*pick(row))
+
+
+def _load_json(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("stations", [])
+    for item in data:
+        yield _station(*(item.get(c) for c in STATION_FIELDS))
+
+
+def _load_sqlite(path):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        cols = {row[1] for row in conn.execute("PRAGMA table_info(stations)")}
+        select = ", ".join(c if c in cols else "NULL" for c in STATION_FIELDS)
+        for row in conn.execute(f"SELECT {select} FROM stations"):
+            yield _station(*row)
+    finally:
+        conn.close()
+
+
+LOADERS = {
+    ".csv": _load_csv,
+    ".json": _load_json,
+    ".db": _load_sqlite,
+    ".sqlite": _load_sqlite,
+    ".sqlite3": _load_sqlite,
+}
+
+
+def load_stations(path):
+    """Read a registry file into {station_id: station}."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in LOADERS:
+        raise ValueError(f"unsupported registry format: {path}")
+    return {st["id"]: st for st in LOADERS[ext](path) if st["id"]}
+
+
+def build_frame_ids(stations):
+    """Index -> station id table for binary frames (see frames.py).
+
+    Raises ValueError for an index the frame can't carry or one shared by
+    two stations, rather than building a huge table or letting one station
+    silently take over another's slot.
+    """
+    owners = {}
+    for sid, st in stations.items():
+        i = st["frame_index"]
+        if i is None:
+            continue
+        if not 0 <= i <= MAX_SENSOR_INDEX:
+            raise ValueError(
+                f"station {sid!r}: frame_index {i} outside 0..{MAX_SENSOR_INDEX}"
+            )
+        if i in owners:
+            raise ValueError(f"stations {owners[i]!r} and {sid!r} share frame_index {i}")
+        owners[i] = sid
+    if not owners:
+        return []
+    frame_ids = [None] * (max(owners) + 1)
+    for i, sid in owners.items():
+        frame_ids[i] = sid
+    return frame_ids
+
+
+def diff_stations(old, new):
+    """Return (added, removed, changed) between two station maps."""
+    added = [new[sid] for sid in new.keys() - old.keys()]
+    removed = list(old.keys() - new.keys())
+    changed = [new[sid] for sid in new.keys() & old.keys() if new[sid] != old[sid]]
+    return added, removed, changed
+
+
+class SensorRegistry:
+    """Station metadata loaded from a file, with optional hot reload."""
+
+    def __init__(self, path):
+        self.path = path
+        self.stations = {}
+        self.frame_ids = []
+        self._mtime = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def load(self):
+        self._mtime = self._current_mtime()
+        stations = load_stations(self.path) if self._mtime else {}
+        self.frame_ids = self._frame_ids(stations)
+        self.stations = stations
+        return self.stations
+
+    def reload(self):
+        """Re-read the file if it changed; return the diff or None."""
+        mtime = self._current_mtime()
+        if mtime == self._mtime:
+            return None
+        # a bad edit keeps the previous registry and is reported once, not
+        # on every poll until the file changes again
+        self._mtime = mtime
+        new = load_stations(self.path) if mtime else {}
+        frame_ids = self._frame_ids(new)
+        diff = diff_stations(self.stations, new)
+        # swap whole objects so readers never see a half-built index
+        self.stations = new
+        self.frame_ids = frame_ids
+        return diff
+
+    def watch(self, on_change, interval=2.0):
+        """Poll the file on a background thread and call on_change(diff)."""
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    diff = self.reload()
+                except Exception as e:
+                    print(f"[Registry] reload failed: {e}")
+                    continue
+                if diff is not None:
+                    on_change(*diff)
+
+        self._thread = threading.Thread(target=run, name="registry-watch", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _frame_ids(self, stations):
+        try:
+            return build_frame_ids(stations)
+        except ValueError as e:
+            raise ValueError(f"{self.path}: {e}") from None
+
+    def _current_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
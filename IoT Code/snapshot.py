@@ -0,0 +1,86 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+
+# ------------------------------
+# STATE SNAPSHOTS
+# ------------------------------
+#
+# The dashboard keeps everything in memory, so a restart (including every
+# debug reloader restart) would start cold. The live state is written
+# periodically to a gzipped JSON file, atomically (temp file + rename), and
+# read back at startup so the service serves last-known data right away.
+
+SNAPSHOT_VERSION = 1
+
+
+def save_snapshot(path, state):
+    """Atomically replace path with the gzipped JSON state."""
+    data = gzip.compress(
+        json.dumps({"version": SNAPSHOT_VERSION, "state": state},
+                   separators=(",", ":")).encode("utf-8"),
+        compresslevel=6,
+    )
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return len(data)
+
+
+def load_snapshot(path):
+    """Return the saved state, or None if missing, unreadable or outdated."""
+    try:
+        with open(path, "rb") as f:
+            doc = json.loads(gzip.decompress(f.read()))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"[Snapshot] ignoring {path}: {e}")
+        return None
+    if doc.get("version") != SNAPSHOT_VERSION:
+        return None
+    return doc.get("state")
+
+
+class SnapshotWriter:
+    """Save collect() to path every `interval` seconds on a background thread."""
+
+    def __init__(self, path, collect, interval=30.0):
+        self.path = path
+        self.collect = collect
+        self.interval = interval
+        self.lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def save(self):
+        # one writer at a time; the periodic thread and atexit may overlap
+        with self.lock:
+            return save_snapshot(self.path, self.collect())
+
+    def start(self):
+        def run():
+            while not self._stop.wait(self.interval):
+                try:
+                    self.save()
+                except Exception as e:
+                    print(f"[Snapshot] save failed: {e}")
+
+        self._thread = threading.Thread(target=run, name="snapshot", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,63 @@
+import socket
+import threading
+
+# ------------------------------
+# UDP INGEST LISTENER
+# ------------------------------
+#
+# Optional non-HTTP path for devices: each datagram carries either one or
+# more binary frames (see frames.py) or a single JSON reading. There is no
+# response, so a reading costs one packet instead of a full HTTP exchange.
+
+MAX_DATAGRAM = 65535
+
+
+class UdpIngestListener:
+    """Receive reading datagrams on a background thread and hand them off."""
+
+    def __init__(self, handler, host="0.0.0.0", port=5001):
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.received = 0
+        self.errors = 0
+        self._sock = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((self.host, self.port))
+        self._sock.settimeout(1.0)
+        self.port = self._sock.getsockname()[1]
+        self._thread = threading.Thread(
+            target=self._run, name="udp-ingest", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._sock is not None:
+            self._sock.close()
+
+    def _run(self):
+        buf = bytearray(MAX_DATAGRAM)
+        view = memoryview(buf)
+        while not self._stop.is_set():
+            try:
+                n, _addr = self._sock.recvfrom_into(buf)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            self.received += 1
+            try:
+                self.handler(view[:n])
+            except Exception as e:
+                self.errors += 1
+                print(f"[UDP] dropped datagram: {e}")
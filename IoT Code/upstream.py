@@ -0,0 +1,114 @@
+import math
+import threading
+import time
+from urllib.parse import urlsplit
+
+# ------------------------------
+# UPSTREAM REQUEST BUDGET
+# ------------------------------
+#
+# Live data comes from free-tier APIs with per-host rate limits. Instead of
+# refreshing every sensor in one burst, each upstream host gets a token
+# bucket and sensors are refreshed one at a time, most urgent first, as
+# tokens come in. Upstream usage is then capped by the bucket rate no matter
+# how many stations exist; the sensors that don't fit are served stale.
+
+# how much sooner a sensor is due, by fire risk (1 + weight)
+RISK_WEIGHT = {"Moderate": 1, "High": 2, "Extreme": 3}
+# sensors viewed this recently refresh twice as often
+INTEREST_SECONDS = 600
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self):
+        with self.lock:
+            self._refill()
+            return max(0.0, self.tokens)
+
+    def try_take(self, n=1):
+        with self.lock:
+            self._refill()
+            if self.tokens < n:
+                return False
+            self.tokens -= n
+            return True
+
+    def give_back(self, n=1):
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + n)
+
+    def drain(self):
+        """Back off after an upstream error: no tokens for a full refill
+        period (capacity / rate), then they accrue as usual."""
+        with self.lock:
+            # go into debt; zeroing alone would let a call through in 1 / rate
+            self.tokens = -self.capacity
+            self.updated = time.monotonic()
+
+
+class UpstreamBudget:
+    """One token bucket per upstream host, shared by all regions."""
+
+    def __init__(self, rate_per_minute=6, burst=10):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            b = self.buckets.get(host)
+            if b is None:
+                b = self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return b
+
+    def available(self, urls):
+        """Whole calls the hosts of urls could all serve right now."""
+        return min(self.bucket(url).available() for url in urls)
+
+    def try_acquire(self, urls):
+        """Take one token for each url's host, or none at all."""
+        taken = []
+        for url in urls:
+            b = self.bucket(url)
+            if not b.try_take():
+                for t in taken:
+                    t.give_back()
+                return False
+            taken.append(b)
+        return True
+
+    def penalize(self, url):
+        self.bucket(url).drain()
+
+    def status(self):
+        with self.lock:
+            buckets = dict(self.buckets)
+        return {host: round(b.available(), 2) for host, b in buckets.items()}
+
+
+def refresh_priority(age, interval, risk=None, viewed=False):
+    """How overdue a sensor is; >= 1 means due for a refresh.
+
+    Never-refreshed sensors (age None) come first, then by staleness scaled
+    up for higher fire risk and for sensors someone is looking at.
+    """
+    if age is None:
+        return math.inf
+    priority = age / interval * (1 + RISK_WEIGHT.get(risk, 0))
+    return priority * 2 if viewed else priority